@@ -0,0 +1,112 @@
+import argparse
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from cache import get_shared_cache
+from notation import from_notation
+
+
+# Analyzes one position given in the notation from notation.py. Returns a
+# JSON-compatible dict with the legal move count, the height/center/distance
+# scores and total score of each move (as calculate_move_scores computes
+# them) and the best move. Ties for best go to the first move generated.
+def analyze_position(line, include_moves=True, cache=None):
+    result = {'position': line}
+    try:
+        game = from_notation(line, cache=cache)
+    except ValueError as e:
+        result['error'] = str(e)
+        return result
+
+    player = game.get_current_player()
+    moves = game.enumerate_moves(player) or []
+    result['legal_moves'] = len(moves)
+    result['best'] = None
+    if not moves:
+        return result
+
+    height_scores, center_scores, distance_scores, move_scores = game.calculate_move_scores(player, moves)
+    best = max(range(len(moves)), key=lambda idx: move_scores[idx])
+    result['best'] = ','.join(moves[best])
+    result['best_score'] = move_scores[best]
+
+    if include_moves:
+        result['moves'] = [
+            {'move': ','.join(move), 'height': height_scores[idx], 'center': center_scores[idx],
+             'distance': distance_scores[idx], 'score': move_scores[idx]}
+            for idx, move in enumerate(moves)
+        ]
+    return result
+
+
+# Analyzes a chunk of lines and returns the results already encoded as JSON
+# lines, which is cheaper to send back from a worker process than dicts.
+# cache_path names an optional EvaluationCache file, flushed after each chunk.
+def analyze_chunk(lines, include_moves=True, cache_path=None):
+    cache = get_shared_cache(cache_path)
+    results = [json.dumps(analyze_position(line, include_moves, cache), separators=(',', ':')) for line in lines]
+    if cache is not None:
+        cache.flush()
+    return results
+
+
+# Yields non-blank, non-comment lines from a file as they are read.
+def read_positions(stream):
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+# Analyzes positions from an iterable and writes one JSON line per position
+# to out, in input order. Input is read lazily and at most window chunks are
+# in flight at a time, so memory stays bounded however long the input is.
+def analyze_stream(positions, out, workers=1, chunk_size=64, include_moves=True, cache_path=None):
+    chunks = iter(lambda: list(islice(positions, chunk_size)), [])
+
+    if workers <= 1:
+        for chunk in chunks:
+            for line in analyze_chunk(chunk, include_moves, cache_path):
+                out.write(line + '\n')
+        return
+
+    window = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(analyze_chunk, chunk, include_moves, cache_path))
+            if len(pending) >= window:
+                for line in pending.popleft().result():
+                    out.write(line + '\n')
+        while pending:
+            for line in pending.popleft().result():
+                out.write(line + '\n')
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Analyze positions given one per line in Santorini notation.")
+    parser.add_argument('input', nargs='?', default='-', help="file of positions, or - for stdin")
+    parser.add_argument('-o', '--output', help="write JSON lines here instead of stdout")
+    parser.add_argument('--workers', type=int, default=1, help="analyze in this many processes")
+    parser.add_argument('--chunk-size', type=int, default=64)
+    parser.add_argument('--best-only', action='store_true', help="omit per-move scores")
+    parser.add_argument('--cache', help="evaluation cache file shared by all workers")
+    args = parser.parse_args(argv[1:])
+
+    source = sys.stdin if args.input == '-' else open(args.input)
+    out = sys.stdout if args.output is None else open(args.output, 'w')
+    try:
+        analyze_stream(read_positions(source), out, args.workers, args.chunk_size, not args.best_only,
+                       args.cache)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,241 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+
+from bench_scaling import calls_per_run, sample_positions, time_runs
+from patterns import DIRECTIONS, Caretaker, Command
+from runner import HeadlessGame
+
+DEFAULT_BASELINE = 'bench_baseline.json'
+
+
+class BenchContext:
+    """A game plus the sampled positions, with a helper for switching the
+    game to one of them."""
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.headless = HeadlessGame('heuristic', 'heuristic', 0)
+        self.game = self.headless.get_game()
+        self.board = self.game.get_board()
+        self.moves = [self.game.enumerate_moves(self.load(i)) or [] for i in range(len(samples))]
+
+    # Restores sample i (by value, so the sample itself is never modified)
+    # and returns the player to move.
+    def load(self, i):
+        state, color = self.samples[i]
+        self.board.restore_state({'board': [row[:] for row in state['board']], 'turn': state['turn'],
+                                  'current_player': color})
+        self.game.set_current_player(color)
+        return self.game.get_current_player()
+
+
+# Each benchmark takes a BenchContext and returns (function, ops), where one
+# call of function performs ops operations of the thing being measured.
+def bench_enumerate_moves(ctx):
+    players = [ctx.load(i) for i in range(len(ctx.samples))]
+    def run():
+        for i, player in enumerate(players):
+            ctx.load(i)
+            ctx.game.enumerate_moves(player)
+    return run, len(players)
+
+
+def bench_validate_move(ctx):
+    def run():
+        for i in range(len(ctx.samples)):
+            player = ctx.load(i)
+            for worker in player.get_workers():
+                for direction in DIRECTIONS:
+                    ctx.game.validate_move(worker, direction, False)
+    return run, len(ctx.samples) * 2 * len(DIRECTIONS)
+
+
+def bench_calculate_move_scores(ctx):
+    total = sum(len(moves) for moves in ctx.moves)
+    def run():
+        for i, moves in enumerate(ctx.moves):
+            player = ctx.load(i)
+            if moves:
+                ctx.game.calculate_move_scores(player, moves)
+    return run, total
+
+
+def bench_get_worker_pos(ctx):
+    ctx.load(len(ctx.samples) // 2)
+    get_worker_pos = ctx.board.get_worker_pos
+    def run():
+        for _ in range(250):
+            get_worker_pos('A')
+            get_worker_pos('B')
+            get_worker_pos('Y')
+            get_worker_pos('Z')
+    return run, 1000
+
+
+# Command.execute followed by Santorini.update_turn (the CLI's per-turn path,
+# including its printing, sent to a throwaway buffer).
+def bench_execute_update_turn(ctx):
+    cases = [(i, moves[0]) for i, moves in enumerate(ctx.moves) if moves]
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i, move in cases:
+                ctx.load(i)
+                Command(move[0], move[1], move[2], ctx.game).execute()
+                ctx.game.update_turn()
+    return run, len(cases)
+
+
+# Creating a memento and pushing it through the Caretaker, then undoing back
+# through the history, as the CLI does with undo/redo on.
+def bench_memento(ctx):
+    ctx.load(len(ctx.samples) // 2)
+    def run():
+        caretaker = Caretaker()
+        for _ in range(50):
+            caretaker.add_past_memento(ctx.board.create_memento())
+            caretaker.push_offset()
+        caretaker.add_past_memento(ctx.board.create_memento())
+        for _ in range(50):
+            ctx.board.restore_from_memento(caretaker.pop_past_memento())
+    return run, 101
+
+
+def _bench_games(white, blue, games):
+    def bench(ctx):
+        def run():
+            for seed in range(games):
+                HeadlessGame(white, blue, seed).play()
+        return run, games
+    return bench
+
+
+BENCHMARKS = {
+    'enumerate_moves': bench_enumerate_moves,
+    'validate_move': bench_validate_move,
+    'calculate_move_scores': bench_calculate_move_scores,
+    'get_worker_pos': bench_get_worker_pos,
+    'execute_update_turn': bench_execute_update_turn,
+    'memento': bench_memento,
+    'random_game': _bench_games('random', 'random', 10),
+    'heuristic_game': _bench_games('heuristic', 'heuristic', 3),
+}
+
+
+# Pure-Python reference workload. Results are also reported relative to it
+# so a baseline recorded on one machine is still meaningful on another. It
+# scans a board-like grid with the same mix of indexing, string checks and
+# dict updates as the hot paths, so it slows down with them when the machine
+# is busy.
+_CALIBRATION_GRID = [[str(row * 5 + col) for col in range(5)] for row in range(5)]
+
+
+def _calibration():
+    seen = {}
+    for _ in range(40):
+        for row_idx, row in enumerate(_CALIBRATION_GRID):
+            for col_idx, cell in enumerate(row):
+                if len(cell) > 1 and cell[0] != '4':
+                    seen[cell] = (row_idx, col_idx)
+    return len(seen)
+
+
+# Runs the selected benchmarks and returns the results as a JSON-compatible dict.
+def run_benchmarks(names=None, repeat=15, positions=100):
+    ctx = BenchContext(sample_positions(5, positions))
+    calibration_number = calls_per_run(_calibration)
+
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        fn, ops = bench(ctx)
+        number = calls_per_run(fn)
+
+        # Alternate calibration and benchmark runs so that a machine that is
+        # busy for part of the run affects both alike, and take the median of
+        # each, which unlike the minimum is stable from one run to the next.
+        times = []
+        ratios = []
+        for _ in range(repeat):
+            calibration_time = time_runs(_calibration, 1, calibration_number)[0]
+            elapsed = time_runs(fn, 1, number)[0]
+            times.append(elapsed)
+            ratios.append(elapsed / calibration_time)
+        results[name] = {'us_per_op': statistics.median(times) / ops * 1e6,
+                         'relative': statistics.median(ratios) / ops}
+
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'benchmarks': results,
+    }
+
+
+# Compares results against a baseline. Returns a list of
+# (name, baseline, current, ratio, regressed) rows.
+def compare(results, baseline, tolerance, absolute=False):
+    key = 'us_per_op' if absolute else 'relative'
+    rows = []
+    for name, current in results['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            continue
+        base = baseline['benchmarks'][name][key]
+        ratio = current[key] / base
+        rows.append((name, base, current[key], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths and compare against a stored baseline.")
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.4, help="allowed slowdown, e.g. 0.4 for 40%%")
+    parser.add_argument('--absolute', action='store_true',
+                        help="compare raw times instead of times relative to the calibration loop")
+    parser.add_argument('--update-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="run only these benchmarks")
+    args = parser.parse_args(argv[1:])
+
+    results = run_benchmarks(args.only, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"Updated baseline {args.baseline}")
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = None
+
+    if baseline is None:
+        for name, result in results['benchmarks'].items():
+            print(f"{name:<24} {result['us_per_op']:>12.2f} us/op")
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    regressions = 0
+    print(f"{'benchmark':<24} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, base, current, ratio, regressed in compare(results, baseline, args.tolerance, args.absolute):
+        regressions += regressed
+        print(f"{name:<24} {base:>12.4f} {current:>12.4f} {ratio:>7.2f}{'  REGRESSION' if regressed else ''}")
+
+    if regressions:
+        print(f"{regressions} benchmark(s) slower than baseline by more than {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
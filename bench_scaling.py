@@ -0,0 +1,126 @@
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from runner import HeadlessGame
+
+
+# Collects (board state, color to move) samples from seeded random games on
+# a board of the given size, giving a fixed, reproducible set of positions.
+def sample_positions(size, count, seed=0):
+    samples = []
+    game_seed = seed
+    while len(samples) < count:
+        headless = HeadlessGame('random', 'random', game_seed, board_size=size)
+        game = headless.get_game()
+        headless.play(on_turn=lambda h: samples.append(
+            (game.get_board().save_state(), game.get_current_player().get_color())))
+        game_seed += 1
+    return samples[:count]
+
+
+# Returns how many calls of fn in a row take at least min_time seconds, so
+# that quick functions are timed over enough calls to rise above timer noise.
+def calls_per_run(fn, min_time=0.02):
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_time:
+            return number
+        number *= 2
+
+
+# Times repeat runs of number calls of fn and returns the seconds per call of
+# each run.
+def time_runs(fn, repeat, number=1):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return times
+
+
+# Measures move generation, move evaluation and full-turn throughput on a
+# board of the given size. Times are in microseconds.
+def bench_size(size, positions=200, games=5, repeat=3, seed=0):
+    samples = sample_positions(size, positions, seed)
+    game = HeadlessGame('heuristic', 'heuristic', seed, board_size=size).get_game()
+    board = game.get_board()
+    players = {'white': game.get_p1(), 'blue': game.get_p2()}
+
+    # Restore into a copy so timing runs never modify the samples.
+    def restore(sample):
+        state, color = sample
+        board.restore_state({'board': [row[:] for row in state['board']], 'turn': state['turn'],
+                             'current_player': color})
+        return players[color]
+
+    move_lists = [game.enumerate_moves(restore(sample)) or [] for sample in samples]
+    total_moves = sum(len(moves) for moves in move_lists)
+
+    def restore_all():
+        for sample in samples:
+            restore(sample)
+
+    def movegen_all():
+        for sample in samples:
+            game.enumerate_moves(restore(sample))
+
+    def eval_all():
+        for sample, moves in zip(samples, move_lists):
+            if moves:
+                game.calculate_move_scores(restore(sample), moves)
+
+    restore_time = statistics.median(time_runs(restore_all, repeat))
+    movegen_time = statistics.median(time_runs(movegen_all, repeat))
+    eval_time = statistics.median(time_runs(eval_all, repeat))
+
+    turns = 0
+    start = time.perf_counter()
+    for game_seed in range(seed, seed + games):
+        headless = HeadlessGame('random', 'random', game_seed, board_size=size)
+        while not headless.is_game_over():
+            headless.play_turn()
+            turns += 1
+    turn_time = time.perf_counter() - start
+
+    return {
+        'size': size,
+        'area': size * size,
+        'moves_per_position': total_moves / len(samples),
+        'movegen_us': (movegen_time - restore_time) / len(samples) * 1e6,
+        'eval_us_per_move': (eval_time - restore_time) / max(1, total_moves) * 1e6,
+        'turn_us': turn_time / turns * 1e6,
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Measure how the hot paths scale with board size.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 7, 9, 11])
+    parser.add_argument('--positions', type=int, default=200)
+    parser.add_argument('--games', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args(argv[1:])
+
+    results = []
+    print(f"{'size':>4} {'area':>5} {'moves':>7} {'movegen us':>11} {'eval us/move':>13} {'turn us':>9}")
+    for size in args.sizes:
+        result = bench_size(size, args.positions, args.games, args.repeat)
+        results.append(result)
+        print(f"{size:>4} {result['area']:>5} {result['moves_per_position']:>7.1f} {result['movegen_us']:>11.1f} "
+              f"{result['eval_us_per_move']:>13.2f} {result['turn_us']:>9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
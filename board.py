@@ -1,17 +1,36 @@
-from patterns import Memento
+from patterns import Memento, WORKERS
 
 class Board:
     """Class which represents the board of a generic game. The board is a
-    5x5 grid of cells which can be updated and adjusted."""
+    size x size grid of cells (5x5 by default) which can be updated and
+    adjusted."""
     
-    def __init__(self):
-        self._board = [
-            ['0', '0', '0', '0', '0'],
-            ['0', '0Y', '0', '0B', '0'],
-            ['0', '0', '0', '0', '0'],
-            ['0', '0A', '0', '0Z', '0'],
-            ['0', '0', '0', '0', '0']
-        ]
+    def __init__(self, size=5, layout=None):
+        if size < 4:
+            raise ValueError("board size must be at least 4")
+
+        # Starting squares of each worker. By default the workers start one
+        # square in from each corner, as on the standard 5x5 board.
+        if layout is None:
+            layout = {
+                'Y': (1, 1), 'B': (1, size - 2),
+                'A': (size - 2, 1), 'Z': (size - 2, size - 2)
+            }
+
+        missing = ''.join(worker for worker in WORKERS if worker not in layout)
+        if missing:
+            raise ValueError(f"missing workers: {missing}")
+
+        self._size = size
+        self._board = [['0'] * size for _ in range(size)]
+        for worker, (row, col) in layout.items():
+            if not (0 <= row < size and 0 <= col < size) or len(self._board[row][col]) > 1:
+                raise ValueError(f"invalid starting square for {worker}: {(row, col)}")
+            self._board[row][col] += worker
+
+        # Index of worker -> (row, col), kept in sync with the grid so looking
+        # up a worker doesn't have to scan the whole board.
+        self._positions = dict(layout)
 
         self._pieces = {
                         'white': ['A', 'B'],
@@ -35,6 +54,13 @@ class Board:
         self._board = state['board']
         self._turn = state['turn']
         self._current_player = state['current_player']
+
+        self._size = len(self._board)
+        self._positions = {}
+        for row in range(self._size):
+            for col in range(self._size):
+                if len(self._board[row][col]) > 1:
+                    self._positions[self._board[row][col][1]] = (row, col)
     
     # Prints the given state of the board.
     def print_state(self, scores=None, state=None):
@@ -68,10 +94,11 @@ class Board:
     
     # Str representation of the board in accordance with the format in the spec.
     def __str__(self):
-        board = "+--+--+--+--+--+\n"
+        border = "+--" * self._size + "+\n"
+        board = border
         for row in self._board:
             board += "|" + "|".join(f"{cell:2s}" for cell in row) + "|\n"
-            board += "+--+--+--+--+--+\n"
+            board += border
         return board
 
     # Updates the current player, checks win conditions, updates turn number
@@ -91,17 +118,42 @@ class Board:
         return self._board
     
     def get_worker_pos(self, worker):
-        for row in range(len(self._board)):
-            for col in range(len(self._board[row])):
-                if worker in self._board[row][col]:
-                    return row, col
+        return self._positions.get(worker)
     
     def set_worker_pos(self, worker, row, col):
         self._board[row][col] = self._board[row][col] + worker
+        self._positions[worker] = (row, col)
     
+    # The index is only cleared if the worker is still recorded on this cell,
+    # since simulate_move places a worker on its new cell before removing it
+    # from the old one.
     def remove_worker_pos(self, worker, row, col):
-        self._board[row][col] = self._board[row][col].replace(worker, '')  
+        self._board[row][col] = self._board[row][col].replace(worker, '')
+        if self._positions.get(worker) == (row, col):
+            del self._positions[worker]
     
+    def get_size(self):
+        return self._size
+
+    # Compact string identifying the heights and worker squares on the board.
+    # Used as the key for caching position evaluations.
+    def position_key(self):
+        return '/'.join(''.join(row) for row in self._board)
+
+    # Inverse of position_key: turns a key back into a list of board rows.
+    @staticmethod
+    def parse_position_key(key):
+        rows = []
+        for row_key in key.split('/'):
+            row = []
+            for char in row_key:
+                if char.isdigit():
+                    row.append(char)
+                else:
+                    row[-1] += char
+            rows.append(row)
+        return rows
+
     def get_turn(self):
         return self._turn
     
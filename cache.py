@@ -0,0 +1,166 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+class EvaluationCache:
+    """Optional on-disk cache of the scores Santorini.calculate_move_scores
+    computes for a position. Each entry covers a whole call: it is keyed on
+    the position, the side to move and the list of moves, and holds the
+    height/center/distance scores of every move plus which moves win, so a
+    call costs at most one lookup. Backed by SQLite in WAL mode so that many
+    processes (tournaments, self-play jobs) can share one file safely. Once
+    the cache grows past max_entries, the least recently used entries are
+    evicted."""
+
+    def __init__(self, path, max_entries=1000000, timeout=30.0):
+        self._path = path
+        self._max_entries = max_entries
+        self._timeout = timeout
+
+        self._conn = None
+        self._pid = None
+
+        # Writes are buffered and flushed together to keep transactions (and
+        # lock contention between processes) to a minimum. Callers should
+        # flush at natural boundaries such as the end of a game; anything
+        # still buffered is flushed when the process exits normally.
+        self._pending = {}
+        self._touched = set()
+        self._flush_size = 512
+        self._inserts_since_evict = 0
+
+        self._hits = 0
+        self._misses = 0
+
+        # Flush whatever is still buffered when the process exits normally,
+        # even if the database was never opened.
+        atexit.register(self.close)
+
+    # Hashes a key string into a signed 64-bit int so it can be used directly
+    # as an SQLite INTEGER PRIMARY KEY.
+    @staticmethod
+    def hash_key(key):
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big', signed=True)
+
+    # Opens the database lazily, and reopens it after a fork since SQLite
+    # connections must not be shared across processes. Buffered entries are
+    # kept: any inherited from a parent are simply written again, which is
+    # harmless since they hold the same scores.
+    def _connect(self):
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        self._conn = sqlite3.connect(self._path, timeout=self._timeout, isolation_level=None)
+        self._pid = os.getpid()
+
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores (key INTEGER PRIMARY KEY, value TEXT, used INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS scores_used ON scores (used)")
+        return self._conn
+
+    # Returns the (height_scores, center_scores, distance_scores, win_idxs)
+    # lists stored under key, or None if they haven't been computed yet.
+    def get(self, key):
+        if key in self._pending:
+            self._hits += 1
+            return self._pending[key]
+
+        row = self._connect().execute("SELECT value FROM scores WHERE key = ?", (key,)).fetchone()
+
+        if row is None:
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        self._touched.add(key)
+        return tuple(json.loads(row[0]))
+
+    def put(self, key, height_scores, center_scores, distance_scores, win_idxs):
+        self._pending[key] = (height_scores, center_scores, distance_scores, win_idxs)
+        if len(self._pending) + len(self._touched) >= self._flush_size:
+            self.flush()
+
+    # Writes buffered entries and access times to disk, then evicts old
+    # entries if the cache is over its size limit.
+    def flush(self):
+        if not self._pending and not self._touched:
+            return
+
+        conn = self._connect()
+        now = time.time_ns()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scores (key, value, used) VALUES (?, ?, ?)",
+                [(key, json.dumps(value, separators=(',', ':')), now) for key, value in self._pending.items()]
+            )
+            conn.executemany("UPDATE scores SET used = ? WHERE key = ?", [(now, key) for key in self._touched])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._inserts_since_evict += len(self._pending)
+        self._pending = {}
+        self._touched = set()
+
+        # Counting rows is a full scan, so only check the limit occasionally.
+        if self._inserts_since_evict >= max(1, self._max_entries // 100):
+            self._inserts_since_evict = 0
+            self.evict()
+
+    # Trims the cache down to 90% of max_entries, dropping the least recently
+    # used entries first.
+    def evict(self):
+        conn = self._connect()
+        count = conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        if count <= self._max_entries:
+            return
+
+        excess = count - int(self._max_entries * 0.9)
+        conn.execute(
+            "DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY used LIMIT ?)", (excess,)
+        )
+
+    def __len__(self):
+        self.flush()
+        return self._connect().execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def get_stats(self):
+        return {'hits': self._hits, 'misses': self._misses}
+
+    # Flushes buffered entries, connecting first if the database was never
+    # opened, and closes this process's connection.
+    def close(self):
+        self.flush()
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# One cache per path per process, so batch tools can pass a path to worker
+# processes and have every game in a worker share a connection.
+_shared_caches = {}
+
+
+def get_shared_cache(path):
+    if path is None:
+        return None
+    key = (os.getpid(), path)
+    if key not in _shared_caches:
+        _shared_caches[key] = EvaluationCache(path)
+    return _shared_caches[key]
@@ -0,0 +1,93 @@
+import json
+import os
+import zlib
+
+from board import Board
+
+SNAPSHOT_VERSION = 1
+
+
+# Board states are stored as [position key, turn, current player] rather than
+# nested lists to keep snapshots of long histories small.
+def _encode_board_state(state):
+    return ['/'.join(''.join(row) for row in state['board']), state['turn'], state['current_player']]
+
+
+def _decode_board_state(encoded):
+    return {
+        'board': Board.parse_position_key(encoded[0]),
+        'turn': encoded[1],
+        'current_player': encoded[2]
+    }
+
+
+# Takes a snapshot of a game as a JSON-compatible dict: the board, turn,
+# current player, player types, RNG state and (if given) the undo/redo
+# history held by a Caretaker.
+def snapshot(game, caretaker=None):
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'state': _encode_board_state(game.get_board().save_state()),
+        'players': [game.get_p1().get_type(), game.get_p2().get_type()],
+    }
+
+    rng_state = game.get_rng().getstate()
+    data['rng'] = [rng_state[0], list(rng_state[1]), rng_state[2]]
+
+    if caretaker is not None:
+        history = caretaker.save_state()
+        data['history'] = {
+            'past': [_encode_board_state(s) for s in history['past']],
+            'future': [_encode_board_state(s) for s in history['future']],
+            'offset': None if history['offset'] is None else _encode_board_state(history['offset'])
+        }
+    return data
+
+
+# Restores a snapshot taken with snapshot() into an existing game (and
+# caretaker, if the snapshot has history).
+def restore(game, data, caretaker=None):
+    if data.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported snapshot version {data.get('version')}")
+
+    state = _decode_board_state(data['state'])
+    game.get_board().restore_state(state)
+    game.set_current_player(state['current_player'])
+
+    version, internal, gauss_next = data['rng']
+    game.get_rng().setstate((version, tuple(internal), gauss_next))
+
+    if caretaker is not None and 'history' in data:
+        history = data['history']
+        caretaker.restore_state({
+            'past': [_decode_board_state(s) for s in history['past']],
+            'future': [_decode_board_state(s) for s in history['future']],
+            'offset': None if history['offset'] is None else _decode_board_state(history['offset'])
+        })
+
+
+def dumps(data):
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode())
+
+
+def loads(raw):
+    return json.loads(zlib.decompress(raw).decode())
+
+
+# Writes a checkpoint to a temporary file and renames it into place, so an
+# interrupted write never replaces a good checkpoint with a truncated one.
+def save_checkpoint(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# Returns the checkpoint stored at path, or None if there isn't one.
+def load_checkpoint(path):
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return loads(f.read())
@@ -0,0 +1,147 @@
+import argparse
+import sys
+
+import numpy as np
+
+from features import extract_position, feature_vectors
+from patterns import Command, TurnStrategy
+
+
+class LinearEvaluator:
+    """Linear position evaluator: value = features . weights + bias. Values
+    estimate the outcome (+1 win, -1 loss) for the side to move."""
+
+    def __init__(self, weights, bias=0.0):
+        self._weights = np.asarray(weights, dtype=np.float32)
+        self._bias = np.float32(bias)
+
+    # Evaluates a single feature vector or a (N, F) batch of them.
+    def evaluate(self, features):
+        return np.tanh(np.asarray(features, dtype=np.float32) @ self._weights + self._bias)
+
+    def save(self, path):
+        np.savez(path, weights=self._weights, bias=self._bias)
+
+
+class MLPEvaluator:
+    """Evaluator with one hidden ReLU layer. Same interface as LinearEvaluator;
+    weights are expected to be trained elsewhere and loaded with
+    load_evaluator."""
+
+    def __init__(self, w1, b1, w2, b2):
+        self._w1 = np.asarray(w1, dtype=np.float32)
+        self._b1 = np.asarray(b1, dtype=np.float32)
+        self._w2 = np.asarray(w2, dtype=np.float32)
+        self._b2 = np.float32(b2)
+
+    def evaluate(self, features):
+        hidden = np.maximum(np.asarray(features, dtype=np.float32) @ self._w1 + self._b1, 0.0)
+        return np.tanh(hidden @ self._w2 + self._b2)
+
+    def save(self, path):
+        np.savez(path, w1=self._w1, b1=self._b1, w2=self._w2, b2=self._b2)
+
+
+# Loads an evaluator saved by LinearEvaluator.save or MLPEvaluator.save.
+def load_evaluator(path):
+    with np.load(path) as data:
+        if 'w1' in data:
+            return MLPEvaluator(data['w1'], data['b1'], data['w2'], data['b2'])
+        return LinearEvaluator(data['weights'], data['bias'])
+
+
+# Fits a LinearEvaluator to self-play shards with ridge regression on the
+# atanh of the outcome. Shards are read one at a time and only the normal
+# equations are kept in memory.
+def fit_linear(paths, l2=1e-2):
+    xtx = None
+    xty = None
+
+    for path in paths:
+        with np.load(path) as data:
+            x = feature_vectors(data['heights'], data['workers'], data['side'], data['scores']).astype(np.float64)
+            y = np.arctanh(data['outcome'].astype(np.float64) * 0.75)
+
+        x = np.concatenate([x, np.ones((len(x), 1))], axis=1)
+        if xtx is None:
+            xtx = np.zeros((x.shape[1], x.shape[1]))
+            xty = np.zeros(x.shape[1])
+        xtx += x.T @ x
+        xty += x.T @ y
+
+    if xtx is None:
+        raise ValueError("no shards to fit")
+
+    solution = np.linalg.solve(xtx + l2 * np.eye(len(xtx)), xty)
+    return LinearEvaluator(solution[:-1], solution[-1])
+
+
+class LearnedTurnStrategy(TurnStrategy):
+    """Subclass which is part of the Strategy design pattern. Picks the move
+    whose resulting position a learned evaluator likes best. Not selectable
+    from the command line; plug it in with Santorini.set_strategy."""
+
+    def __init__(self, santorini, evaluator):
+        super().__init__(santorini)
+        self._evaluator = evaluator
+
+    def make_turn(self, player):
+        moves = self._game.enumerate_moves(player)
+        if player.get_color() == 'white':
+            other_player = self._game.get_p2()
+        else:
+            other_player = self._game.get_p1()
+
+        if moves is None:
+            self._condition_checker.notify_game_over(other_player.get_color())
+            return None
+
+        board = self._game.get_board()
+        positions = []
+        win_idxs = []
+        for idx, move in enumerate(moves):
+            self._game.simulate_move(move[0], move[1])
+            self._game.simulate_build(move[0], move[2])
+
+            row, col = board.get_worker_pos(move[0])
+            if board.access_board(row, col)[0] == '3':
+                win_idxs.append(idx)
+            positions.append(extract_position(self._game, other_player.get_color()))
+
+            self._game.undo_build(move[0], move[2])
+            self._game.undo_move(move[0], move[1])
+
+        if win_idxs:
+            best_moves = win_idxs
+        else:
+            # The opponent is to move in every resulting position, so the
+            # value for us is the negation of the evaluator's output.
+            values = -self._evaluator.evaluate(feature_vectors(*(np.stack(p) for p in zip(*positions))))
+            best_moves = np.flatnonzero(values == values.max()).tolist()
+
+        move = moves[self._game.get_rng().choice(best_moves)]
+
+        if self._game.get_score_display() == 'on':
+            self._game.simulate_move(move[0], move[1])
+            self._game.simulate_build(move[0], move[2])
+            height_score, center_score, distance_score = self._game.calculate_curr_scores(player.get_color())
+            self._game.undo_build(move[0], move[2])
+            self._game.undo_move(move[0], move[1])
+            return Command(move[0], move[1], move[2], self._game, height_score, center_score, distance_score)
+
+        return Command(move[0], move[1], move[2], self._game)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Fit a linear evaluator to self-play shards.")
+    parser.add_argument('shards', nargs='+')
+    parser.add_argument('-o', '--output', default='evaluator.npz')
+    parser.add_argument('--l2', type=float, default=1e-2)
+    args = parser.parse_args(argv[1:])
+
+    fit_linear(args.shards, args.l2).save(args.output)
+    print(f"Saved evaluator to {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,64 @@
+import numpy as np
+
+# Order of the per-position scores stored alongside the board planes.
+SCORE_NAMES = ('height', 'center', 'distance')
+
+
+# Extracts the raw features of the current position in a game: the height
+# grid, one worker plane per color (white, blue), the side to move (0 for
+# white, 1 for blue) and the side to move's height/center/distance scores.
+def extract_position(game, color=None):
+    board = game.get_board().get_board()
+    size = len(board)
+
+    if color is None:
+        color = game.get_current_player().get_color()
+
+    heights = np.zeros((size, size), dtype=np.int8)
+    workers = np.zeros((2, size, size), dtype=np.int8)
+    for row in range(size):
+        for col in range(size):
+            cell = board[row][col]
+            heights[row, col] = int(cell[0])
+            if len(cell) > 1:
+                workers[0 if cell[1] in game.get_p1().get_workers() else 1, row, col] = 1
+
+    side = 0 if color == 'white' else 1
+    scores = np.array(game.calculate_curr_scores(color), dtype=np.int16)
+    return heights, workers, side, scores
+
+
+# Turns raw position arrays (single positions or batches with a leading
+# dimension) into float feature vectors from the side to move's perspective:
+# normalized heights, own workers, opposing workers, then the three scores.
+def feature_vectors(heights, workers, side, scores):
+    heights = np.asarray(heights)
+    workers = np.asarray(workers)
+    side = np.asarray(side)
+    scores = np.asarray(scores)
+
+    single = heights.ndim == 2
+    if single:
+        heights = heights[None]
+        workers = workers[None]
+        side = side[None]
+        scores = scores[None]
+
+    count = heights.shape[0]
+    idx = np.arange(count)
+    own = workers[idx, side]
+    other = workers[idx, 1 - side]
+
+    features = np.concatenate([
+        heights.reshape(count, -1) / 4.0,
+        own.reshape(count, -1),
+        other.reshape(count, -1),
+        scores.reshape(count, -1),
+    ], axis=1).astype(np.float32)
+
+    return features[0] if single else features
+
+
+# Number of features produced by feature_vectors for a board of the given size.
+def feature_count(size=5):
+    return 3 * size * size + len(SCORE_NAMES)
@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+
+class LoadClient:
+    """Simulated player for load testing the server. Starts games and answers
+    every YOURMOVE with a random legal move, recording how long the server
+    took to reply to each move (including the AI's turn)."""
+
+    def __init__(self, reader, writer, rng):
+        self._reader = reader
+        self._writer = writer
+        self._rng = rng
+        self._latencies = []
+        self._games = 0
+
+    def get_latencies(self):
+        return self._latencies
+
+    def get_games(self):
+        return self._games
+
+    async def _send(self, line):
+        self._writer.write((line + '\n').encode())
+        await self._writer.drain()
+
+    # Reads lines until one starts with one of the given prefixes.
+    async def _expect(self, *prefixes):
+        while True:
+            line = (await self._reader.readline()).decode()
+            if not line:
+                raise ConnectionError("server closed the connection")
+            if line.startswith(prefixes):
+                return line.split()
+
+    async def play_game(self, ai_type):
+        color = self._rng.choice(('white', 'blue'))
+        await self._send(f"NEW {color} {ai_type} {self._rng.getrandbits(32)}")
+        reply = await self._expect('YOURMOVE', 'GAMEOVER', 'ERR')
+
+        while reply[0] == 'YOURMOVE':
+            await self._send("MOVES")
+            moves = (await self._expect('MOVES'))[1:]
+            start = time.perf_counter()
+            await self._send("MOVE " + self._rng.choice(moves))
+            reply = await self._expect('YOURMOVE', 'GAMEOVER', 'ERR')
+            self._latencies.append(time.perf_counter() - start)
+
+        self._games += 1
+
+    async def close(self):
+        await self._send("QUIT")
+        self._writer.close()
+
+
+async def run_client(args, client_id, deadline):
+    if args.unix is not None:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+
+    client = LoadClient(reader, writer, random.Random(args.seed + client_id))
+    while time.perf_counter() < deadline:
+        await client.play_game(args.ai)
+    await client.close()
+    return client
+
+
+async def run(args):
+    start = time.perf_counter()
+    deadline = start + args.duration
+    clients = await asyncio.gather(*(run_client(args, i, deadline) for i in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for client in clients for latency in client.get_latencies())
+    games = sum(client.get_games() for client in clients)
+    print(f"{args.clients} clients, {games} games, {len(latencies)} moves in {elapsed:.1f}s "
+          f"({len(latencies) / elapsed:.1f} moves/s)")
+    if latencies:
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+        print(f"move latency ms: mean {statistics.mean(latencies) * 1000:.1f}, p50 {percentile(0.5):.1f}, "
+              f"p95 {percentile(0.95):.1f}, p99 {percentile(0.99):.1f}, max {latencies[-1] * 1000:.1f}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Load generator for server.py.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--unix', help="connect to a Unix socket at this path instead of TCP")
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds to keep starting games")
+    parser.add_argument('--ai', default='heuristic', choices=['heuristic', 'random'])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv[1:])
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
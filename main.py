@@ -1,5 +1,8 @@
+import os
 import sys
 
+import checkpoint
+import tracing
 from santorini import Santorini
 from patterns import GameOverObserver, ConditionChecker, Caretaker
 
@@ -14,6 +17,10 @@ class SantoriniCLI:
         self._undo_redo = 'off'
         self._score_display = 'off'
 
+        # If set, the game is checkpointed to this file after every turn and
+        # resumed from it on the next start.
+        self._checkpoint_path = None
+
         # Observer pattern. Used to notify when the game is over.
         self._observer = GameOverObserver()
         self._condition_checker = ConditionChecker(self._observer)
@@ -47,6 +54,14 @@ class SantoriniCLI:
             self._undo_redo = argv[3]
         if len(argv) > 4:
             self._score_display = argv[4]
+        if len(argv) > 5:
+            self._checkpoint_path = argv[5]
+
+        saved = checkpoint.load_checkpoint(self._checkpoint_path)
+        if saved is not None:
+            self._resume(saved)
+            self.run()
+            return
         
         self._game = Santorini(self._white_player_type, self._blue_player_type, self._score_display, self._condition_checker)
         print(self._game.get_board(), end="")
@@ -56,23 +71,54 @@ class SantoriniCLI:
             print("Turn: 1, white (AB)")
         self.run()
 
+    # Restores the game, settings and undo/redo history from a checkpoint and
+    # prints the position it left off at.
+    def _resume(self, saved):
+        self._white_player_type, self._blue_player_type = saved['players']
+        self._undo_redo, self._score_display = saved['cli']
+
+        self._game = Santorini(self._white_player_type, self._blue_player_type, self._score_display, self._condition_checker)
+        checkpoint.restore(self._game, saved, self._caretaker)
+
+        if self._score_display == 'on':
+            scores = self._game.calculate_curr_scores(self._game.get_current_player().get_color())
+            self._game.get_board().print_state(scores=scores)
+        else:
+            self._game.get_board().print_state()
+
+    def _save_checkpoint(self):
+        saved = checkpoint.snapshot(self._game, self._caretaker)
+        saved['cli'] = [self._undo_redo, self._score_display]
+        checkpoint.save_checkpoint(self._checkpoint_path, saved)
+
     def run(self):
         while not self._observer.is_game_over():
             if self._undo_redo == 'on':
                 self._caretaker.add_past_memento(self._game._board.create_memento())
                 self.handle_history_options()
                 
-            command = self._game.execute_current_player_turn()
-            
-            command.execute()
-            command.print(self._score_display)  
+            turn = self._game.get_board().get_turn()
+            color = self._game.get_current_player().get_color()
+            with tracing.span('turn', turn=turn, player=color):
+                command = self._game.execute_current_player_turn()
+                
+                command.execute()
+                with tracing.span('render'):
+                    command.print(self._score_display)  
+
+                    print(self._game.get_board(), end="")
+
+                if self._score_display == 'on':
+                    self._game.update_turn(scores=True)
+                else:
+                    self._game.update_turn()
 
-            print(self._game.get_board(), end="")
+            if self._checkpoint_path is not None:
+                self._save_checkpoint()
 
-            if self._score_display == 'on':
-                self._game.update_turn(scores=True)
-            else:
-                self._game.update_turn()
+        # The game is finished, so there's nothing left to resume.
+        if self._checkpoint_path is not None and os.path.exists(self._checkpoint_path):
+            os.remove(self._checkpoint_path)
             
         print(self._observer.get_winner() + " has won")
         print("Play again?")
@@ -84,4 +130,6 @@ class SantoriniCLI:
 
 
 if __name__ == "__main__":
+    # Set SANTORINI_TRACE to a file name to record a Chrome trace of the game.
+    tracing.enable_from_env()
     SantoriniCLI().start(sys.argv)
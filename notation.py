@@ -0,0 +1,57 @@
+from santorini import Santorini
+from board import Board
+from patterns import WORKERS, GameOverObserver, ConditionChecker
+
+# Side to move as written in the notation.
+_SIDES = {'w': 'white', 'b': 'blue'}
+_SIDE_LETTERS = {'white': 'w', 'blue': 'b'}
+
+
+# Writes the current position of a game as a single line:
+#   <rows> <side to move> <turn>
+# where rows lists every cell's height, followed by the worker standing on it
+# if there is one, with rows separated by '/'. The standard starting position
+# is "00000/00Y00B0/00000/00A00Z0/00000 w 1".
+def to_notation(game):
+    board = game.get_board()
+    side = _SIDE_LETTERS[game.get_current_player().get_color()]
+    return f"{board.position_key()} {side} {board.get_turn()}"
+
+
+# Parses a position written by to_notation into a new Santorini game set up
+# at that position. The turn number is optional and defaults to 1. Raises
+# ValueError if the notation is malformed.
+def from_notation(text, white='heuristic', blue='heuristic', score_display='off', checker=None, cache=None):
+    fields = text.split()
+    if len(fields) not in (2, 3):
+        raise ValueError(f"expected '<rows> <w|b> [turn]', got {text!r}")
+    if fields[1] not in _SIDES:
+        raise ValueError(f"side to move must be 'w' or 'b', got {fields[1]!r}")
+
+    try:
+        rows = Board.parse_position_key(fields[0])
+        turn = int(fields[2]) if len(fields) == 3 else 1
+    except (IndexError, ValueError):
+        raise ValueError(f"malformed position {text!r}") from None
+
+    size = len(rows)
+    layout = {}
+    for row_idx, row in enumerate(rows):
+        if len(row) != size:
+            raise ValueError(f"board must be square, row {row_idx} has {len(row)} cells")
+        for col_idx, cell in enumerate(row):
+            if cell[0] not in '01234' or len(cell) > 2 or (len(cell) == 2 and cell[1] not in WORKERS):
+                raise ValueError(f"invalid cell {cell!r} at {(row_idx, col_idx)}")
+            if len(cell) == 2:
+                if cell[1] in layout:
+                    raise ValueError(f"worker {cell[1]} appears more than once")
+                layout[cell[1]] = (row_idx, col_idx)
+
+    if checker is None:
+        checker = ConditionChecker(GameOverObserver())
+    game = Santorini(white, blue, score_display, checker, cache=cache, board_size=size, layout=layout)
+
+    color = _SIDES[fields[1]]
+    game.get_board().restore_state({'board': rows, 'turn': turn, 'current_player': color})
+    game.set_current_player(color)
+    return game
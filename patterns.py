@@ -1,10 +1,24 @@
-import random
+import tracing
+
+# Directions and workers in the order used throughout the game, along with the
+# (row, col) offset for each direction. Built once at import time so moves don't
+# have to rebuild a lookup table every time they are executed.
+DIRECTIONS = ('n', 'ne', 'e', 'se', 's', 'sw', 'w', 'nw')
+OFFSETS = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+WORKERS = ('A', 'B', 'Y', 'Z')
+
+DIRECTION_OFFSETS = dict(zip(DIRECTIONS, OFFSETS))
+DIRECTION_INDEX = {direction: idx for idx, direction in enumerate(DIRECTIONS)}
+WORKER_INDEX = {worker: idx for idx, worker in enumerate(WORKERS)}
 
 class Command:
     """Used to implement the Command design pattern. Stores information
     about making moves on the board, including the worker moved, the direction
     moved in, and the direction built in."""
 
+    __slots__ = ('_worker', '_move_direction', '_build_direction', '_santorini',
+                 '_height_score', '_center_score', '_distance_score')
+
     def __init__(self, worker, move_direction, build_direction, santorini, height_score=None, center_score=None, distance_score=None):
         self._worker = worker
         self._move_direction = move_direction
@@ -19,30 +33,23 @@ class Command:
         self._distance_score = distance_score
 
     # Updates the board to reflect the move
+    @tracing.traced('Command.execute')
     def execute(self):
-        directions = {
-            'n': [-1, 0],
-            'ne': [-1, 1],
-            'e': [0, 1],
-            'se': [1, 1],
-            's': [1, 0],
-            'sw': [1, -1],
-            'w': [0, -1],
-            'nw': [-1, -1]
-        }
+        board = self._santorini.get_board()
+        move_row, move_col = DIRECTION_OFFSETS[self._move_direction]
+        build_row, build_col = DIRECTION_OFFSETS[self._build_direction]
 
-        row, col = self._santorini.get_board().get_worker_pos(self._worker)
-        self._santorini.get_board().remove_worker_pos(self._worker, row, col)
+        row, col = board.get_worker_pos(self._worker)
+        board.remove_worker_pos(self._worker, row, col)
 
-        row += directions[self._move_direction][0]
-        col += directions[self._move_direction][1]
-        self._santorini.get_board().set_worker_pos(self._worker, row, col)
+        row += move_row
+        col += move_col
+        board.set_worker_pos(self._worker, row, col)
+        board.build_level(row + build_row, col + build_col)
 
-        row, col = self._santorini.get_board().get_worker_pos(self._worker)
-        row += directions[self._build_direction][0]
-        col += directions[self._build_direction][1]
-        self._santorini.get_board().build_level(row, col)
-    
+    # Returns the compact Move equivalent of this command.
+    def to_move(self):
+        return Move.from_strings(self._worker, self._move_direction, self._build_direction)
 
     def print(self, score_display):
         result = self._worker + "," + self._move_direction + "," + self._build_direction
@@ -51,6 +58,87 @@ class Command:
         print(result)
 
 
+class Move:
+    """Compact form of a move used by search code and game records. The worker,
+    move direction and build direction are packed into a single int
+    (worker * 64 + move * 8 + build), and the object itself only has one slot,
+    so millions of them can be held at a few dozen bytes each. Unlike Command,
+    a Move does not hold on to the game and is executed against a board."""
+
+    __slots__ = ('_code',)
+
+    def __init__(self, code):
+        self._code = code
+
+    @staticmethod
+    def encode(worker, move_direction, build_direction):
+        return (WORKER_INDEX[worker] << 6) | (DIRECTION_INDEX[move_direction] << 3) | DIRECTION_INDEX[build_direction]
+
+    @classmethod
+    def from_strings(cls, worker, move_direction, build_direction):
+        return cls(cls.encode(worker, move_direction, build_direction))
+
+    # Builds a Move from the [worker, move_direction, build_direction] lists
+    # returned by Santorini.enumerate_moves.
+    @classmethod
+    def from_list(cls, move):
+        return cls(cls.encode(move[0], move[1], move[2]))
+
+    def get_code(self):
+        return self._code
+
+    def get_worker(self):
+        return WORKERS[self._code >> 6]
+
+    def get_move_direction(self):
+        return DIRECTIONS[(self._code >> 3) & 7]
+
+    def get_build_direction(self):
+        return DIRECTIONS[self._code & 7]
+
+    def to_list(self):
+        return [self.get_worker(), self.get_move_direction(), self.get_build_direction()]
+
+    def to_command(self, santorini, height_score=None, center_score=None, distance_score=None):
+        return Command(self.get_worker(), self.get_move_direction(), self.get_build_direction(),
+                       santorini, height_score, center_score, distance_score)
+
+    # Moves the worker and builds on the given board.
+    def execute(self, board):
+        worker, move_row, move_col, build_row, build_col = _MOVE_TABLE[self._code]
+        row, col = board.get_worker_pos(worker)
+        board.remove_worker_pos(worker, row, col)
+        row += move_row
+        col += move_col
+        board.set_worker_pos(worker, row, col)
+        board.build_level(row + build_row, col + build_col)
+
+    # Reverses execute(). Must be called on the board state execute() left
+    # behind, since the worker's original square is found from its offset.
+    def undo(self, board):
+        worker, move_row, move_col, build_row, build_col = _MOVE_TABLE[self._code]
+        row, col = board.get_worker_pos(worker)
+        board.build_destroy(row + build_row, col + build_col)
+        board.remove_worker_pos(worker, row, col)
+        board.set_worker_pos(worker, row - move_row, col - move_col)
+
+    def __eq__(self, other):
+        return isinstance(other, Move) and self._code == other._code
+
+    def __hash__(self):
+        return self._code
+
+    def __repr__(self):
+        return f"Move({self.get_worker()},{self.get_move_direction()},{self.get_build_direction()})"
+
+# Decoded (worker, move_row, move_col, build_row, build_col) for every Move code,
+# so executing a Move is a single tuple lookup.
+_MOVE_TABLE = tuple(
+    (WORKERS[code >> 6],) + OFFSETS[(code >> 3) & 7] + OFFSETS[code & 7]
+    for code in range(len(WORKERS) * 64)
+)
+
+
 class GameOverObserver:
     """Used to implement the Observer design pattern. Stores information
     about whether the game is over and who the winner is."""
@@ -124,6 +212,21 @@ class Caretaker:
     def clear_future_states(self):
         self._future_states = []
     
+    # Returns the board states held by the caretaker, oldest first. Used to
+    # checkpoint the undo/redo history.
+    def save_state(self):
+        return {
+            'past': [memento.get_state() for memento in self._past_states],
+            'future': [memento.get_state() for memento in self._future_states],
+            'offset': None if self._offset is None else self._offset.get_state()
+        }
+
+    # Restores the history from a dict returned by save_state.
+    def restore_state(self, state):
+        self._past_states = [Memento(s) for s in state['past']]
+        self._future_states = [Memento(s) for s in state['future']]
+        self._offset = None if state['offset'] is None else Memento(state['offset'])
+
     def push_offset(self):
         self._past_states.append(self._offset)
         board = [row[:] for row in self._offset.get_state()['board']]
@@ -224,7 +327,7 @@ class RandomTurnStrategy(TurnStrategy):
         if moves is None:
             self._condition_checker.notify_game_over(other_player.get_color())
         else:
-            move = random.choice(moves)
+            move = self._game.get_rng().choice(moves)
         
         if self._game.get_score_display() == 'on':
             self._game.simulate_move(move[0], move[1])
@@ -238,10 +341,18 @@ class RandomTurnStrategy(TurnStrategy):
 
 class HeuristicTurnStrategy(TurnStrategy):
     """Subclass which is part of the Strategy design pattern. Used for the logic
-    of a heuristic turn."""
+    of a heuristic turn. weights overrides the (height, center, distance)
+    weights used to score moves. If threat_depth is set, the strategy first
+    looks for a forced win within that many of its own moves, and otherwise
+    skips moves that let the opponent step onto level 3 next turn."""
 
-    def __init__(self, santorini):
+    def __init__(self, santorini, weights=None, threat_depth=0):
         super().__init__(santorini)
+        self._weights = weights
+        self._threat_depth = threat_depth
+
+    def get_weights(self):
+        return self._weights
 
     def make_turn(self, player):
         moves = self._game.enumerate_moves(player)
@@ -251,17 +362,27 @@ class HeuristicTurnStrategy(TurnStrategy):
         else:
             other_player = self._game.get_p1()
         
+        forced_move = None
+        if moves is not None and self._threat_depth > 0:
+            # Imported here since threats builds on Move from this module.
+            from threats import find_forced_win, prune_losing_moves
+            forced_move = find_forced_win(self._game, player, self._threat_depth)
+            if forced_move is None:
+                moves = prune_losing_moves(self._game, player, moves)
+
         if moves is None:
             self._condition_checker.notify_game_over(other_player.get_color())
+        elif forced_move is not None:
+            move = forced_move
         else:
-            height_score, center_score, distance_score, move_scores = self._game.calculate_move_scores(player, moves)
+            height_score, center_score, distance_score, move_scores = self._game.calculate_move_scores(player, moves, self._weights)
 
             best_moves = []
             for idx, move in enumerate(moves):
                 if move_scores[idx] == max(move_scores):
                     best_moves.append(idx)
             
-            move = moves[random.choice(best_moves)]
+            move = moves[self._game.get_rng().choice(best_moves)]
             
         if self._game.get_score_display() == 'on':
             self._game.simulate_move(move[0], move[1])
@@ -14,6 +14,9 @@ class Player:
 
     def get_color(self):
         return self._color
+
+    def get_type(self):
+        return self._type
         
 
 class Human(Player):
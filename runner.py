@@ -0,0 +1,61 @@
+import random
+
+import tracing
+from santorini import Santorini
+from patterns import GameOverObserver, ConditionChecker
+
+class HeadlessGame:
+    """Runs a game of Santorini without the CLI. Nothing is printed and no
+    input is read, so AI-vs-AI games can be played in bulk by batch jobs such
+    as self-play data generation and tuning."""
+
+    def __init__(self, white='heuristic', blue='heuristic', seed=None, cache=None, board_size=5):
+        # Observer pattern, same as in SantoriniCLI
+        self._observer = GameOverObserver()
+        self._condition_checker = ConditionChecker(self._observer)
+
+        # Every game gets its own RNG so a seed fully determines the game.
+        self._rng = random.Random(seed)
+        self._game = Santorini(white, blue, 'off', self._condition_checker, cache=cache, rng=self._rng,
+                               board_size=board_size)
+
+    def get_game(self):
+        return self._game
+
+    def get_rng(self):
+        return self._rng
+
+    def is_game_over(self):
+        return self._observer.is_game_over()
+
+    def get_winner(self):
+        return self._observer.get_winner()
+
+    # Gets and executes the current player's move, then advances the turn.
+    # Returns the Command that was executed.
+    def play_turn(self):
+        color = self._game.get_current_player().get_color()
+        with tracing.span('turn', turn=self._game.get_board().get_turn(), player=color):
+            command = self._game.execute_current_player_turn()
+            command.execute()
+            self._game.advance_turn()
+
+        # Write this game's cached evaluations out before the process moves
+        # on; pool workers exit without running atexit hooks.
+        if self.is_game_over() and self._game.get_cache() is not None:
+            self._game.get_cache().flush()
+        return command
+
+    # Plays the game to the end and returns the winner. If given, on_turn is
+    # called with this HeadlessGame before every move.
+    def play(self, on_turn=None):
+        while not self.is_game_over():
+            if on_turn is not None:
+                on_turn(self)
+            self.play_turn()
+        return self.get_winner()
+
+
+# Plays a single headless game and returns the color of the winner.
+def play_game(white='heuristic', blue='heuristic', seed=None, cache=None, board_size=5):
+    return HeadlessGame(white, blue, seed, cache, board_size).play()
@@ -1,15 +1,27 @@
 import random
 
+import tracing
 from board import Board
 from player import Human, Heuristic, Random
-from patterns import Command, HumanTurnStrategy, RandomTurnStrategy, HeuristicTurnStrategy
+from patterns import DIRECTION_OFFSETS, Command, HumanTurnStrategy, RandomTurnStrategy, HeuristicTurnStrategy
+
+# Default weights (height, center, distance) used when scoring moves.
+DEFAULT_WEIGHTS = (3, 2, 1)
 
 class Santorini:
     """Class which manages the Santorini ruleset and gameflow. Can make
     changes to the board and game's settings based on CLI."""
 
-    def __init__(self, white, blue, score_display, checker):
-        self._board = Board()
+    def __init__(self, white, blue, score_display, checker, cache=None, rng=None, board_size=5, layout=None):
+        self._board = Board(board_size, layout)
+
+        # Source of randomness for the AI strategies. Defaults to the random
+        # module itself; batch jobs pass a seeded random.Random instead.
+        self._rng = rng if rng is not None else random
+
+        # Optional EvaluationCache shared between processes. Consulted by
+        # calculate_move_scores before evaluating a position.
+        self._cache = cache
 
         self._score_display = score_display
         self._directions = ['n', 'ne', 'e', 'se', 's', 'sw', 'w', 'nw']
@@ -47,6 +59,15 @@ class Santorini:
         else:
             return HeuristicTurnStrategy(self)
     
+    # Replaces the strategy used for one color, e.g. to plug in a strategy
+    # that isn't selectable from the command line.
+    def set_strategy(self, color, strategy):
+        if color == 'white':
+            self._white_strategy = strategy
+        else:
+            self._blue_strategy = strategy
+
+    @tracing.traced('strategy')
     def execute_current_player_turn(self):
         current_strategy = self._white_strategy if self._current_player == self._p1 else self._blue_strategy
         return current_strategy.make_turn(player=self._current_player)
@@ -108,6 +129,7 @@ class Santorini:
         return False
     
     # Calculates all possible moves for a given player and returns them in a list.
+    @tracing.traced('enumerate_moves')
     def enumerate_moves(self, player):
         moves = []
         for worker in player.get_workers():
@@ -148,37 +170,58 @@ class Santorini:
         return height_score, center_score, distance_score
 
     # Calculates the scores for each move in a list of moves. Returns a list of
-    # scores for each move.
-    def calculate_move_scores(self, player, moves):
+    # scores for each move. weights is a (height, center, distance) tuple and
+    # defaults to DEFAULT_WEIGHTS.
+    @tracing.traced('calculate_move_scores')
+    def calculate_move_scores(self, player, moves, weights=None):
+        # Weights for calculating move scores
+        c1, c2, c3 = DEFAULT_WEIGHTS if weights is None else weights
+
+        # The cache stores the unweighted scores for the whole call, keyed on
+        # the position, side to move and moves, so it's one lookup per call.
+        if self._cache is None:
+            height_scores, center_scores, distance_scores, win_idxs = self._score_moves(player, moves)
+        else:
+            key = self._cache.hash_key(player.get_color() + ':' + self._board.position_key() + ':'
+                                       + ';'.join(','.join(move) for move in moves))
+            cached = self._cache.get(key)
+            if cached is None:
+                cached = self._score_moves(player, moves)
+                self._cache.put(key, *cached)
+            height_scores, center_scores, distance_scores, win_idxs = cached
+
+        win_idxs = set(win_idxs)
+        move_scores = []
+        for i in range(len(moves)):
+            # If a move would put a worker on a level 3 building, give it a
+            # very high score to ensure heuristic chooses it
+            if i in win_idxs:
+                move_scores.append(999999)
+            else:
+                move_scores.append((height_scores[i] * c1) + (center_scores[i] * c2) + (distance_scores[i] * c3))
+
+        return height_scores, center_scores, distance_scores, move_scores
+
+    # Simulates each move and scores the resulting position. Returns the
+    # height, center and distance scores of every move, plus the indexes of
+    # the moves that put a worker on a level 3 building.
+    def _score_moves(self, player, moves):
         height_scores = []
         center_scores = []
         distance_scores = []
         win_idxs = []
 
-        # Weights for calculating move scores
-        c1 = 3
-        c2 = 2
-        c3 = 1
-
         for idx, move in enumerate(moves):
-            height = 0
-            center = 0
-
             new_worker = move[0]
             move_direction = move[1]
             self.simulate_move(new_worker, move_direction)
 
-            for worker in player.get_workers():
-                row, col = self._board.get_worker_pos(worker)
-                height += self.calc_height_score(worker)
-                
-                # If a move would put a worker on a level 3 building, add it to
-                # win idxs
-                if self._board.access_board(row, col)[0] == '3':
-                    win_idxs.append(idx)
+            height, center, distance, win = self._evaluate_position(player)
 
-                center += self.calc_center_score(worker)
-            distance = self.calc_distance_score(player)
+            # If a move would put a worker on a level 3 building, add it to
+            # win idxs
+            if win:
+                win_idxs.append(idx)
 
             self.undo_move(new_worker, move_direction)
 
@@ -186,16 +229,31 @@ class Santorini:
             center_scores.append(center)
             distance_scores.append(distance)
 
-        move_scores = []
-        for i in range(len(moves)):
-            # If a move would put a worker on a level 3 building, give it a
-            # very high score to ensure heuristic chooses it
-            if i in win_idxs:
-                move_scores.append(999999)
-            else:
-                move_scores.append((height_scores[i] * c1) + (center_scores[i] * c2) + (distance_scores[i] * c3))
+        return height_scores, center_scores, distance_scores, win_idxs
 
-        return height_scores, center_scores, distance_scores, move_scores
+    # Scores the current position for a player. Returns the height, center
+    # and distance scores along with whether one of the player's workers is
+    # standing on a level 3 building.
+    def _evaluate_position(self, player):
+        height = 0
+        center = 0
+        win = False
+
+        for worker in player.get_workers():
+            row, col = self._board.get_worker_pos(worker)
+            height += self.calc_height_score(worker)
+            if self._board.access_board(row, col)[0] == '3':
+                win = True
+            center += self.calc_center_score(worker)
+        distance = self.calc_distance_score(player)
+
+        return height, center, distance, win
+
+    def get_cache(self):
+        return self._cache
+
+    def set_cache(self, cache):
+        self._cache = cache
 
     # Helper function used to calculate the height score of a given worker.
     def calc_height_score(self, worker):
@@ -205,14 +263,14 @@ class Santorini:
         return height
 
     # Helper function used to calculate the center score of a given worker.
+    # On a 5x5 board this is 2 on the center square, 1 on the ring around it
+    # and 0 on the edge. Larger boards get one more ring per extra square.
+    # Even-sized boards treat the central 2x2 block as the center.
     def calc_center_score(self, worker):
-        center = 0
+        size = self._board.get_size()
         row, col = self._board.get_worker_pos(worker)
-        if row == 2 and col == 2:
-            center += 2
-        elif 1 <= row <= 3 and 1 <= col <= 3:
-            center += 1
-        return center
+        rings_out = max(abs(2 * row - (size - 1)), abs(2 * col - (size - 1))) // 2
+        return (size - 1) // 2 - rings_out
     
     # Calculate Chebyshev distance between two workers
     def distance(self, worker1, worker2):
@@ -220,17 +278,21 @@ class Santorini:
         row2, col2 = self._board.get_worker_pos(worker2)
         return max(abs(row1 - row2), abs(col1 - col2))
 
-    # Calculates distance score for a given player
+    # Calculates distance score for a given player. Distances are subtracted
+    # from twice the largest possible distance on the board (8 on a 5x5 board).
     def calc_distance_score(self, player):
         distance = 0
+        max_distance = 2 * (self._board.get_size() - 1)
         if player == 'white':
-            distance += 8 - (min(self.distance('B', 'Y'), self.distance('A', 'Y')) + min(self.distance('B', 'Z'), self.distance('A', 'Z')))
+            distance += max_distance - (min(self.distance('B', 'Y'), self.distance('A', 'Y')) + min(self.distance('B', 'Z'), self.distance('A', 'Z')))
         else:
-            distance += 8 - (min(self.distance('Z', 'A'), self.distance('Y', 'A')) + min(self.distance('Z', 'B'), self.distance('Y', 'B')))
+            distance += max_distance - (min(self.distance('Z', 'A'), self.distance('Y', 'A')) + min(self.distance('Z', 'B'), self.distance('Y', 'B')))
         return distance
     
-    # Updates the current player, checks win conditions, and prints the turn.
-    def update_turn(self, scores=False):
+    # Updates the current player and checks win conditions without printing
+    # anything. Used directly by headless games.
+    @tracing.traced('advance_turn')
+    def advance_turn(self):
         if self._current_player == self._p1:
             self._current_player = self._p2
             other_player = self._p1
@@ -238,70 +300,54 @@ class Santorini:
             self._current_player = self._p1
             other_player = self._p2
 
-        # Check win condition (one of the players' workers is on a level 3
-        # building). If so, notify the observer that the game is over.
-        for row in self._board.get_board():
-            for cell in row:
-                if 'A' in str(cell) or 'B' in str(cell):
-                    if '3' in str(cell):
-                        self._condition_checker.notify_game_over('white')
-                elif 'Y' in str(cell) or 'Z' in str(cell):
-                    if '3' in str(cell):
-                        self._condition_checker.notify_game_over('blue')
-
-        valid_moves = self.enumerate_moves(self._current_player)
+        with tracing.span('win_check'):
+            # Check win condition (one of the players' workers is on a level 3
+            # building). If so, notify the observer that the game is over.
+            # Only the workers' squares need checking, not the whole board.
+            for player in (self._p1, self._p2):
+                for worker in player.get_workers():
+                    row, col = self._board.get_worker_pos(worker)
+                    if self._board.access_board(row, col)[0] == '3':
+                        self._condition_checker.notify_game_over(player.get_color())
 
-        if not valid_moves:
-            self._condition_checker.notify_game_over(other_player.get_color())
+            valid_moves = self.enumerate_moves(self._current_player)
 
-        height_score, center_score, distance_score = self.calculate_curr_scores(self._current_player.get_color())
-        scores = [height_score, center_score, distance_score]
+            if not valid_moves:
+                self._condition_checker.notify_game_over(other_player.get_color())
 
         self._board.update_turn()
-        
-        workers = ''.join(self._current_player.get_workers())
-        if scores is not None and self._score_display == 'on':
-            print("Turn: " + str(self._board.get_turn()) + ", " + self._current_player.get_color() + " (" + workers + "), (" + str(scores[0]) + ', ' + str(scores[1]) + ', ' + str(scores[2]) + ')')
-        else:
-            print("Turn: " + str(self._board.get_turn()) + ", " + self._current_player.get_color() + " (" + workers + ")")
+
+    # Updates the current player, checks win conditions, and prints the turn.
+    @tracing.traced('update_turn')
+    def update_turn(self, scores=False):
+        self.advance_turn()
+
+        with tracing.span('render'):
+            height_score, center_score, distance_score = self.calculate_curr_scores(self._current_player.get_color())
+            scores = [height_score, center_score, distance_score]
+
+            workers = ''.join(self._current_player.get_workers())
+            if scores is not None and self._score_display == 'on':
+                print("Turn: " + str(self._board.get_turn()) + ", " + self._current_player.get_color() + " (" + workers + "), (" + str(scores[0]) + ', ' + str(scores[1]) + ', ' + str(scores[2]) + ')')
+            else:
+                print("Turn: " + str(self._board.get_turn()) + ", " + self._current_player.get_color() + " (" + workers + ")")
 
     
     # Helper function used to simulate a build on the board. Used for checking
     # if a build is valid.
     def simulate_build(self, worker, build_direction):
-        directions = {
-            'n': [-1, 0],
-            'ne': [-1, 1],
-            'e': [0, 1],
-            'se': [1, 1],
-            's': [1, 0],
-            'sw': [1, -1],
-            'w': [0, -1],
-            'nw': [-1, -1]
-        }
-
         row, col = self._board.get_worker_pos(worker)
-        row += directions[build_direction][0]
-        col += directions[build_direction][1]
+        row += DIRECTION_OFFSETS[build_direction][0]
+        col += DIRECTION_OFFSETS[build_direction][1]
 
         self._board.build_level(row, col)
     
     # Helper function used to undo a build on the board. Used for undoing a
     # build when we simulate a turn.
     def undo_build(self, worker, build_direction):
-        directions = {
-            'n': [-1, 0],
-            'ne': [-1, 1],
-            'e': [0, 1],
-            'se': [1, 1],
-            's': [1, 0],
-            'sw': [1, -1],
-            'w': [0, -1],
-            'nw': [-1, -1]
-        }
         row, col = self._board.get_worker_pos(worker)
-        row += directions[build_direction][0]
-        col += directions[build_direction][1]
+        row += DIRECTION_OFFSETS[build_direction][0]
+        col += DIRECTION_OFFSETS[build_direction][1]
         self._board.build_destroy(row, col)
     
     # Used as part of undo/redo functionality.
@@ -310,11 +356,10 @@ class Santorini:
         # initial state of the board.
         if caretaker.len_past_states() == 0:
             # Print the current state again
-            print(self._board, end='')
             if self._score_display == 'on':
-                print("Turn: 1, white (AB), (0, 2, 4)")
+                self._board.print_state(scores=self.calculate_curr_scores(self._current_player.get_color()))
             else:
-                print("Turn: 1, white (AB)")
+                self._board.print_state()
             return
         
         # Save the current state of the board to future states.
@@ -404,3 +449,12 @@ class Santorini:
     
     def get_p1(self):
         return self._p1
+
+    def get_current_player(self):
+        return self._current_player
+
+    def set_current_player(self, color):
+        self._current_player = self._p1 if color == 'white' else self._p2
+
+    def get_rng(self):
+        return self._rng
@@ -0,0 +1,196 @@
+import argparse
+import os
+import sys
+from multiprocessing import Pool
+
+import numpy as np
+
+import checkpoint
+from cache import get_shared_cache
+from features import extract_position
+from runner import HeadlessGame
+
+
+class ShardWriter:
+    """Streams self-play positions into fixed-size .npz shards. Positions are
+    copied into preallocated arrays and written out as soon as a shard fills
+    up, so memory use is bounded by shard_size no matter how many games are
+    played."""
+
+    def __init__(self, out_dir, shard_size=100000, prefix='selfplay', board_size=5, compress=False, shard_index=0,
+                 positions_written=0):
+        self._out_dir = out_dir
+        self._shard_size = shard_size
+        self._prefix = prefix
+        self._board_size = board_size
+        self._compress = compress
+        self._shard_index = shard_index
+        self._positions_written = positions_written
+
+        os.makedirs(out_dir, exist_ok=True)
+        self._allocate()
+
+    def _allocate(self):
+        size = self._board_size
+        self._buffer = {
+            'heights': np.zeros((self._shard_size, size, size), dtype=np.int8),
+            'workers': np.zeros((self._shard_size, 2, size, size), dtype=np.int8),
+            'side': np.zeros(self._shard_size, dtype=np.int8),
+            'scores': np.zeros((self._shard_size, 3), dtype=np.int16),
+            'outcome': np.zeros(self._shard_size, dtype=np.int8),
+        }
+        self._fill = 0
+
+    # Adds the positions of one game, given as a dict of equally long arrays
+    # keyed like the shard buffer. Spills over into new shards as needed.
+    def add(self, positions):
+        count = len(positions['side'])
+        start = 0
+        while start < count:
+            take = min(count - start, self._shard_size - self._fill)
+            for key, array in self._buffer.items():
+                array[self._fill:self._fill + take] = positions[key][start:start + take]
+            self._fill += take
+            start += take
+            if self._fill == self._shard_size:
+                self.flush()
+
+    # Writes whatever is buffered as a new shard. The shard is written to a
+    # temporary file first so a crash never leaves a truncated shard behind.
+    def flush(self):
+        if self._fill == 0:
+            return
+
+        path = os.path.join(self._out_dir, f"{self._prefix}_{self._shard_index:05d}.npz")
+        tmp_path = path + '.tmp'
+        arrays = {key: array[:self._fill] for key, array in self._buffer.items()}
+        with open(tmp_path, 'wb') as f:
+            if self._compress:
+                np.savez_compressed(f, **arrays)
+            else:
+                np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+        self._positions_written += self._fill
+        self._shard_index += 1
+        self._fill = 0
+
+    def get_shard_index(self):
+        return self._shard_index
+
+    # Number of positions waiting to be written with the next shard.
+    def get_buffered(self):
+        return self._fill
+
+    def get_positions_written(self):
+        return self._positions_written
+
+    def close(self):
+        self.flush()
+
+
+# Plays one self-play game and returns its positions as arrays, labeled with
+# the final outcome from the side to move's perspective (+1 win, -1 loss).
+# Module-level so it can be sent to worker processes.
+def play_selfplay_game(args):
+    white, blue, seed, cache_path = args
+    headless = HeadlessGame(white, blue, seed, get_shared_cache(cache_path))
+    game = headless.get_game()
+
+    positions = []
+    headless.play(on_turn=lambda h: positions.append(extract_position(game)))
+    winner = 0 if headless.get_winner() == 'white' else 1
+
+    return {
+        'heights': np.stack([p[0] for p in positions]),
+        'workers': np.stack([p[1] for p in positions]),
+        'side': np.array([p[2] for p in positions], dtype=np.int8),
+        'scores': np.stack([p[3] for p in positions]),
+        'outcome': np.array([1 if p[2] == winner else -1 for p in positions], dtype=np.int8),
+    }
+
+
+# Runs self-play games (in parallel if workers > 1) and streams their
+# positions into shards. Game i is seeded with seed + i, so a run is fully
+# reproducible. If checkpoint_path is given, progress is saved every time a
+# shard is written and an interrupted run resumes from there, producing the
+# same shards as an uninterrupted one. cache_path names an optional
+# EvaluationCache file shared by all workers. Returns the ShardWriter once all
+# games are written.
+def generate(out_dir, games, white='heuristic', blue='heuristic', seed=0, workers=1, shard_size=100000,
+             compress=False, checkpoint_path=None, cache_path=None):
+    config = {'games': games, 'white': white, 'blue': blue, 'seed': seed, 'shard_size': shard_size}
+
+    # A checkpoint records the next game to play, how many of its positions
+    # already made it into written shards, and where the writer was.
+    progress = {'next_game': 0, 'skip': 0, 'shard_index': 0, 'positions_written': 0}
+    saved = checkpoint.load_checkpoint(checkpoint_path)
+    if saved is not None:
+        if saved['config'] != config:
+            raise ValueError(f"checkpoint {checkpoint_path} was written with different settings")
+        progress = saved['progress']
+
+    writer = ShardWriter(out_dir, shard_size=shard_size, compress=compress, shard_index=progress['shard_index'],
+                         positions_written=progress['positions_written'])
+    jobs = ((white, blue, seed + i, cache_path) for i in range(progress['next_game'], games))
+    skip = progress['skip']
+
+    def add_game(game_index, positions):
+        nonlocal skip
+        offset = skip
+        if skip:
+            positions = {key: array[skip:] for key, array in positions.items()}
+            skip = 0
+
+        shard_index = writer.get_shard_index()
+        writer.add(positions)
+        if checkpoint_path is not None and writer.get_shard_index() != shard_index:
+            # Everything up to this game is on disk, except for the tail of
+            # this game still sitting in the buffer.
+            buffered = writer.get_buffered()
+            checkpoint.save_checkpoint(checkpoint_path, {'config': config, 'progress': {
+                'next_game': game_index if buffered else game_index + 1,
+                'skip': offset + len(positions['side']) - buffered if buffered else 0,
+                'shard_index': writer.get_shard_index(),
+                'positions_written': writer.get_positions_written(),
+            }})
+
+    if workers > 1:
+        with Pool(workers) as pool:
+            for game_index, positions in enumerate(pool.imap(play_selfplay_game, jobs, chunksize=8),
+                                                   progress['next_game']):
+                add_game(game_index, positions)
+    else:
+        for game_index, job in enumerate(jobs, progress['next_game']):
+            add_game(game_index, play_selfplay_game(job))
+
+    writer.close()
+    if checkpoint_path is not None:
+        checkpoint.save_checkpoint(checkpoint_path, {'config': config, 'progress': {
+            'next_game': games, 'skip': 0, 'shard_index': writer.get_shard_index(),
+            'positions_written': writer.get_positions_written(),
+        }})
+    return writer
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Generate a self-play dataset for learned evaluation.")
+    parser.add_argument('out_dir')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--white', default='heuristic', choices=['heuristic', 'random'])
+    parser.add_argument('--blue', default='heuristic', choices=['heuristic', 'random'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--shard-size', type=int, default=100000)
+    parser.add_argument('--compress', action='store_true')
+    parser.add_argument('--checkpoint', help="checkpoint file used to resume an interrupted run")
+    parser.add_argument('--cache', help="evaluation cache file shared by all workers")
+    args = parser.parse_args(argv[1:])
+
+    writer = generate(args.out_dir, args.games, args.white, args.blue, args.seed,
+                      args.workers, args.shard_size, args.compress, args.checkpoint, args.cache)
+    print(f"Wrote {writer.get_positions_written()} positions in {writer.get_shard_index()} shards")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
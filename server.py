@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from santorini import Santorini
+from patterns import Command, GameOverObserver, ConditionChecker
+
+HELP = "commands: NEW <white|blue> [heuristic|random] [seed], MOVE <worker> <move> <build>, MOVES, BOARD, QUIT"
+
+
+# Picks a move for the AI from a saved board state. Module-level and free of
+# any session objects so it can run in a worker process.
+def choose_ai_move(state, color, ai_type, seed):
+    white, blue = (ai_type, 'human') if color == 'white' else ('human', ai_type)
+    game = Santorini(white, blue, 'off', ConditionChecker(GameOverObserver()), rng=random.Random(seed))
+    game.get_board().restore_state(state)
+    game.set_current_player(color)
+
+    command = game.execute_current_player_turn()
+    return command.to_move().to_list()
+
+
+class GameSession:
+    """A single game hosted by the server: the connected client plays one
+    color and the server's AI plays the other."""
+
+    def __init__(self, human_color, ai_type='heuristic', seed=None):
+        self._human_color = human_color
+        self._ai_color = 'blue' if human_color == 'white' else 'white'
+        self._ai_type = ai_type
+        self._rng = random.Random(seed)
+
+        # Observer pattern, same as in SantoriniCLI
+        self._observer = GameOverObserver()
+        white, blue = ('human', ai_type) if human_color == 'white' else (ai_type, 'human')
+        self._game = Santorini(white, blue, 'off', ConditionChecker(self._observer), rng=self._rng)
+
+    def is_game_over(self):
+        return self._observer.is_game_over()
+
+    def get_winner(self):
+        return self._observer.get_winner()
+
+    def is_ai_turn(self):
+        return not self.is_game_over() and self._game.get_current_player().get_color() == self._ai_color
+
+    def legal_moves(self):
+        return self._game.enumerate_moves(self._game.get_current_player()) or []
+
+    # A legal move picked with the session's own RNG, so games with a fixed
+    # seed stay reproducible even when the AI falls back to it.
+    def random_move(self):
+        return self._rng.choice(self.legal_moves())
+
+    # One-line summary of the position: turn, side to move and board.
+    def state_line(self):
+        board = self._game.get_board()
+        color = self._game.get_current_player().get_color()
+        return f"STATE {board.get_turn()} {color} {board.position_key()}"
+
+    def board_lines(self):
+        return str(self._game.get_board()).splitlines()
+
+    # Plays a move given as [worker, move_direction, build_direction].
+    # Returns an error message if the move isn't legal, otherwise None.
+    def play_move(self, move):
+        if move not in self.legal_moves():
+            return "illegal move"
+        Command(move[0], move[1], move[2], self._game).execute()
+        self._game.advance_turn()
+        return None
+
+    # Arguments for choose_ai_move for the current position.
+    def ai_job(self):
+        return (self._game.get_board().save_state(), self._ai_color, self._ai_type,
+                self._rng.getrandbits(64))
+
+
+class SantoriniServer:
+    """Hosts many concurrent games over TCP or a Unix socket using a simple
+    line protocol. Each connection plays one game at a time against the AI.
+    AI turns run in an executor so they never block the event loop, and a
+    turn that takes longer than move_timeout falls back to a random legal
+    move to keep per-move latency bounded."""
+
+    def __init__(self, executor, move_timeout=5.0):
+        self._executor = executor
+        self._move_timeout = move_timeout
+        self._connections = 0
+        self._games_played = 0
+
+    def get_stats(self):
+        return {'connections': self._connections, 'games_played': self._games_played}
+
+    async def handle_client(self, reader, writer):
+        self._connections += 1
+        session = None
+
+        def send(*lines):
+            writer.write(''.join(line + '\n' for line in lines).encode())
+
+        try:
+            send("WELCOME santorini", HELP)
+            while True:
+                await writer.drain()
+                try:
+                    data = await reader.readline()
+                except ValueError:
+                    # Line longer than the stream limit. The rest of it is
+                    # still unread, so there's no way to resynchronise.
+                    send("ERR line too long")
+                    break
+                if not data:
+                    break
+                try:
+                    parts = data.decode().replace(',', ' ').split()
+                except UnicodeDecodeError:
+                    send("ERR invalid input")
+                    continue
+                if not parts:
+                    continue
+                command = parts[0].upper()
+
+                if command == 'QUIT':
+                    send("BYE")
+                    break
+                elif command == 'NEW':
+                    session = self._new_session(parts, send)
+                    if session is not None:
+                        await self._advance(session, send)
+                elif session is None:
+                    send("ERR no game, start one with NEW")
+                elif command == 'BOARD':
+                    send(*session.board_lines(), "END")
+                elif command == 'MOVES':
+                    send("MOVES " + ' '.join(','.join(move) for move in session.legal_moves()))
+                elif command == 'MOVE':
+                    if session.is_game_over() or session.is_ai_turn():
+                        send("ERR not your turn")
+                    elif len(parts) != 4:
+                        send("ERR usage: MOVE <worker> <move> <build>")
+                    else:
+                        error = session.play_move(parts[1:4])
+                        if error is not None:
+                            send("ERR " + error)
+                        else:
+                            send("OK")
+                            await self._advance(session, send)
+                else:
+                    send("ERR unknown command", HELP)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections -= 1
+            writer.close()
+
+    def _new_session(self, parts, send):
+        color = parts[1].lower() if len(parts) > 1 else 'white'
+        ai_type = parts[2].lower() if len(parts) > 2 else 'heuristic'
+        if color not in ('white', 'blue') or ai_type not in ('heuristic', 'random'):
+            send("ERR usage: NEW <white|blue> [heuristic|random] [seed]")
+            return None
+        try:
+            seed = int(parts[3]) if len(parts) > 3 else None
+        except ValueError:
+            send("ERR seed must be an integer")
+            return None
+        return GameSession(color, ai_type, seed)
+
+    # Plays AI turns until it's the client's turn or the game is over, then
+    # tells the client which.
+    async def _advance(self, session, send):
+        loop = asyncio.get_running_loop()
+        while session.is_ai_turn():
+            job = session.ai_job()
+            try:
+                move = await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, choose_ai_move, *job), self._move_timeout
+                )
+            except asyncio.TimeoutError:
+                move = session.random_move()
+            session.play_move(move)
+            send("AIMOVE " + ','.join(move))
+
+        send(session.state_line())
+        if session.is_game_over():
+            self._games_played += 1
+            send("GAMEOVER " + session.get_winner())
+        else:
+            send("YOURMOVE")
+
+
+async def serve(server, host='127.0.0.1', port=7777, unix_path=None):
+    if unix_path is not None:
+        listener = await asyncio.start_unix_server(server.handle_client, path=unix_path)
+    else:
+        listener = await asyncio.start_server(server.handle_client, host, port)
+
+    addresses = ', '.join(str(sock.getsockname()) for sock in listener.sockets)
+    print(f"Serving on {addresses}", flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Host many concurrent Santorini games over a line protocol.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--unix', help="listen on a Unix socket at this path instead of TCP")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="AI worker processes")
+    parser.add_argument('--threads', action='store_true', help="run AI turns in threads instead of processes")
+    parser.add_argument('--move-timeout', type=float, default=5.0)
+    args = parser.parse_args(argv[1:])
+
+    executor_type = ThreadPoolExecutor if args.threads else ProcessPoolExecutor
+    with executor_type(max_workers=args.workers) as executor:
+        server = SantoriniServer(executor, args.move_timeout)
+        try:
+            asyncio.run(serve(server, args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,234 @@
+from patterns import WORKERS, OFFSETS, Move
+
+# Index of each worker in ThreatBoard positions, and which workers each color owns.
+_COLOR_WORKERS = {'white': (0, 1), 'blue': (2, 3)}
+_OTHER_COLOR = {'white': 'blue', 'blue': 'white'}
+
+# Neighbor tables per board size, built on first use.
+_NEIGHBOR_CACHE = {}
+
+
+# Returns (neighbors, adjacency) for a board size: neighbors[i] is a tuple of
+# (direction index, cell) pairs for every on-board neighbor of cell i, and
+# adjacency[i] is the same set of cells as a bitmask.
+def _neighbor_tables(size):
+    if size not in _NEIGHBOR_CACHE:
+        neighbors = []
+        adjacency = []
+        for cell in range(size * size):
+            row, col = divmod(cell, size)
+            cell_neighbors = []
+            mask = 0
+            for direction, (d_row, d_col) in enumerate(OFFSETS):
+                new_row, new_col = row + d_row, col + d_col
+                if 0 <= new_row < size and 0 <= new_col < size:
+                    other = new_row * size + new_col
+                    cell_neighbors.append((direction, other))
+                    mask |= 1 << other
+            neighbors.append(tuple(cell_neighbors))
+            adjacency.append(mask)
+        _NEIGHBOR_CACHE[size] = (tuple(neighbors), tuple(adjacency))
+    return _NEIGHBOR_CACHE[size]
+
+
+class ThreatBoard:
+    """Lightweight copy of a position used for threat detection and forced-win
+    search. Heights are a flat list, worker squares are cell indices, and the
+    level 3 squares and occupied squares are kept as bitmasks so that
+    "can this player step onto level 3" is a couple of mask operations."""
+
+    def __init__(self, heights, positions, size):
+        self._size = size
+        self._heights = heights
+        self._positions = positions
+        self._neighbors, self._adjacency = _neighbor_tables(size)
+
+        self._level3 = 0
+        for cell, height in enumerate(heights):
+            if height == 3:
+                self._level3 |= 1 << cell
+
+    @classmethod
+    def from_board(cls, board):
+        grid = board.get_board()
+        size = len(grid)
+        heights = []
+        positions = [0] * len(WORKERS)
+        for row in range(size):
+            for col in range(size):
+                cell = grid[row][col]
+                heights.append(int(cell[0]))
+                if len(cell) > 1:
+                    positions[WORKERS.index(cell[1])] = row * size + col
+        return cls(heights, positions, size)
+
+    def _occupied(self):
+        occupied = 0
+        for cell in self._positions:
+            occupied |= 1 << cell
+        return occupied
+
+    # Bitmask of level 3 squares the given color could step onto right now.
+    def threat_squares(self, color):
+        free3 = self._level3 & ~self._occupied()
+        squares = 0
+        for worker in _COLOR_WORKERS[color]:
+            cell = self._positions[worker]
+            if self._heights[cell] >= 2:
+                squares |= self._adjacency[cell] & free3
+        return squares
+
+    def has_win_in_1(self, color):
+        return self.threat_squares(color) != 0
+
+    # Generates the legal moves for a color as Move codes. Moves that step onto
+    # level 3 (immediate wins) come first.
+    def move_codes(self, color):
+        wins = []
+        others = []
+        heights = self._heights
+        occupied = self._occupied()
+
+        for worker in _COLOR_WORKERS[color]:
+            start = self._positions[worker]
+            start_height = heights[start]
+            for move_dir, cell in self._neighbors[start]:
+                height = heights[cell]
+                if occupied >> cell & 1 or height == 4 or height - start_height > 1:
+                    continue
+                # The worker leaves its start square, which becomes buildable.
+                after = (occupied & ~(1 << start)) | (1 << cell)
+                for build_dir, build_cell in self._neighbors[cell]:
+                    if after >> build_cell & 1 or heights[build_cell] == 4:
+                        continue
+                    code = (worker << 6) | (move_dir << 3) | build_dir
+                    if height == 3:
+                        wins.append(code)
+                    else:
+                        others.append(code)
+        return wins + others
+
+    # Applies a Move code and returns what undo_code needs to reverse it.
+    def apply_code(self, code):
+        worker = code >> 6
+        start = self._positions[worker]
+        d_row, d_col = OFFSETS[(code >> 3) & 7]
+        cell = start + d_row * self._size + d_col
+        b_row, b_col = OFFSETS[code & 7]
+        build_cell = cell + b_row * self._size + b_col
+
+        self._positions[worker] = cell
+        self._heights[build_cell] += 1
+        self._update_level3(build_cell)
+        return worker, start, build_cell
+
+    def undo_code(self, undo):
+        worker, start, build_cell = undo
+        self._positions[worker] = start
+        self._heights[build_cell] -= 1
+        self._update_level3(build_cell)
+
+    def _update_level3(self, cell):
+        if self._heights[cell] == 3:
+            self._level3 |= 1 << cell
+        else:
+            self._level3 &= ~(1 << cell)
+
+    def is_win_code(self, code):
+        worker = code >> 6
+        d_row, d_col = OFFSETS[(code >> 3) & 7]
+        return self._heights[self._positions[worker] + d_row * self._size + d_col] == 3
+
+
+# Returns the moves (in enumerate_moves format) with which a player wins
+# immediately by stepping onto a level 3 building.
+def winning_moves(santorini, player):
+    threat_board = ThreatBoard.from_board(santorini.get_board())
+    color = player.get_color()
+    if not threat_board.has_win_in_1(color):
+        return []
+    return [Move(code).to_list() for code in threat_board.move_codes(color) if threat_board.is_win_code(code)]
+
+
+# Returns the level 3 squares the opponent of player could step onto next turn,
+# as (row, col) pairs. These are the squares player must block.
+def must_block_squares(santorini, player):
+    threat_board = ThreatBoard.from_board(santorini.get_board())
+    size = len(santorini.get_board().get_board())
+    squares = threat_board.threat_squares(_OTHER_COLOR[player.get_color()])
+    return [divmod(cell, size) for cell in range(size * size) if squares >> cell & 1]
+
+
+# Removes moves that let the opponent win on their next turn by stepping onto
+# level 3, unless every move does (in which case the list is left alone).
+# Immediate winning moves are always kept.
+def prune_losing_moves(santorini, player, moves):
+    threat_board = ThreatBoard.from_board(santorini.get_board())
+    other = _OTHER_COLOR[player.get_color()]
+
+    safe = []
+    for move in moves:
+        code = Move.encode(move[0], move[1], move[2])
+        if threat_board.is_win_code(code):
+            safe.append(move)
+            continue
+        undo = threat_board.apply_code(code)
+        if not threat_board.has_win_in_1(other):
+            safe.append(move)
+        threat_board.undo_code(undo)
+
+    return safe if safe else moves
+
+
+class _SearchBudget(Exception):
+    pass
+
+
+# Searches for a move that forces a win within depth of the player's own
+# moves, whatever the opponent replies. A win is stepping onto level 3 or
+# leaving the opponent without a legal move. The search gives up (returning
+# None) after max_nodes positions. Returns the winning move in
+# enumerate_moves format, or None.
+def find_forced_win(santorini, player, depth=2, max_nodes=200000):
+    threat_board = ThreatBoard.from_board(santorini.get_board())
+    nodes = [0]
+    try:
+        code = _forced_win(threat_board, player.get_color(), depth, nodes, max_nodes)
+    except _SearchBudget:
+        return None
+    return None if code is None else Move(code).to_list()
+
+
+def _forced_win(threat_board, color, depth, nodes, max_nodes):
+    nodes[0] += 1
+    if nodes[0] > max_nodes:
+        raise _SearchBudget()
+
+    codes = threat_board.move_codes(color)
+    if codes and threat_board.is_win_code(codes[0]):
+        return codes[0]
+    if depth <= 1:
+        return None
+
+    other = _OTHER_COLOR[color]
+    for code in codes:
+        undo = threat_board.apply_code(code)
+        forced = False
+
+        # Skip moves that hand the opponent an immediate win.
+        if not threat_board.has_win_in_1(other):
+            replies = threat_board.move_codes(other)
+            forced = True
+            for reply in replies:
+                reply_undo = threat_board.apply_code(reply)
+                refuted = _forced_win(threat_board, color, depth - 1, nodes, max_nodes) is None
+                threat_board.undo_code(reply_undo)
+                if refuted:
+                    forced = False
+                    break
+
+        threat_board.undo_code(undo)
+        if forced:
+            return code
+
+    return None
@@ -0,0 +1,103 @@
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+
+class Tracer:
+    """Records timed spans and exports them in the Chrome trace-event JSON
+    format, which can be opened in chrome://tracing, Perfetto or speedscope.
+    Spans opened inside other spans on the same thread show up nested."""
+
+    def __init__(self):
+        self._events = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            event = {
+                'name': name,
+                'ph': 'X',
+                'ts': start / 1000,
+                'dur': (end - start) / 1000,
+                'pid': self._pid,
+                'tid': threading.get_ident(),
+            }
+            if args:
+                event['args'] = args
+            with self._lock:
+                self._events.append(event)
+
+    def get_events(self):
+        return self._events
+
+    def clear(self):
+        with self._lock:
+            self._events = []
+
+    def export(self, path):
+        with self._lock:
+            events = list(self._events)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+# The active tracer, or None when tracing is off (the default).
+_tracer = None
+_NO_SPAN = contextlib.nullcontext()
+
+
+def enable(tracer=None):
+    global _tracer
+    _tracer = tracer if tracer is not None else Tracer()
+    return _tracer
+
+
+def disable():
+    global _tracer
+    _tracer = None
+
+
+def get_tracer():
+    return _tracer
+
+
+# Turns tracing on if the SANTORINI_TRACE environment variable names an
+# output file, and exports the trace there when the process exits.
+def enable_from_env():
+    path = os.environ.get('SANTORINI_TRACE')
+    if not path:
+        return None
+    tracer = enable()
+    atexit.register(tracer.export, path)
+    return tracer
+
+
+# Context manager recording a span on the active tracer. Does nothing when
+# tracing is off.
+def span(name, **args):
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.span(name, **args)
+
+
+# Decorator recording a span for every call of a function while tracing is on.
+def traced(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with _tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,158 @@
+import argparse
+import os
+import random
+import sys
+from multiprocessing import Pool
+
+import checkpoint
+from cache import get_shared_cache
+from patterns import HeuristicTurnStrategy, RandomTurnStrategy
+from runner import HeadlessGame
+from santorini import DEFAULT_WEIGHTS
+
+
+# Plays one seeded game between two weight vectors and returns 1 if the
+# first one won, 0 otherwise. The first opening_plies moves are random (drawn
+# from the game's seeded RNG) so matches cover more than one line of play.
+# Module-level so it can be sent to worker processes.
+def play_match_game(args):
+    weights_a, weights_b, seed, a_is_white, opening_plies, cache_path = args
+    headless = HeadlessGame('heuristic', 'heuristic', seed, get_shared_cache(cache_path))
+    game = headless.get_game()
+
+    white_weights, blue_weights = (weights_a, weights_b) if a_is_white else (weights_b, weights_a)
+    game.set_strategy('white', HeuristicTurnStrategy(game, white_weights))
+    game.set_strategy('blue', HeuristicTurnStrategy(game, blue_weights))
+    opening_strategy = RandomTurnStrategy(game)
+
+    while not headless.is_game_over():
+        if game.get_board().get_turn() <= opening_plies:
+            command = opening_strategy.make_turn(game.get_current_player())
+            command.execute()
+            game.advance_turn()
+        else:
+            headless.play_turn()
+
+    a_color = 'white' if a_is_white else 'blue'
+    return 1 if headless.get_winner() == a_color else 0
+
+
+# Plays a match of the given number of games and returns the fraction won by
+# weights_a. Games are played in pairs that share a seed with colors swapped.
+# cache_path names an optional EvaluationCache file shared by all workers.
+def play_match(pool, weights_a, weights_b, games, seed, opening_plies=4, cache_path=None):
+    jobs = [(weights_a, weights_b, seed + i // 2, i % 2 == 0, opening_plies, cache_path) for i in range(games)]
+    results = pool.map(play_match_game, jobs) if pool is not None else list(map(play_match_game, jobs))
+    return sum(results) / games
+
+
+class SPSATuner:
+    """Tunes the (height, center, distance) weights with SPSA. Each iteration
+    perturbs every weight at once in a random direction and plays the two
+    perturbed vectors against each other; the match result gives a gradient
+    estimate for all weights. The perturbation for iteration k only depends
+    on the seed and k, so resuming from a checkpoint reproduces the same run."""
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, games=64, seed=0, a=1.0, c=0.5, opening_plies=4, cache_path=None):
+        self._weights = [float(w) for w in weights]
+        self._games = games
+        self._seed = seed
+        self._a = a
+        self._c = c
+        self._opening_plies = opening_plies
+        self._cache_path = cache_path
+        self._iteration = 0
+        self._history = []
+
+    def get_weights(self):
+        return tuple(self._weights)
+
+    def get_iteration(self):
+        return self._iteration
+
+    def to_checkpoint(self):
+        return {
+            'iteration': self._iteration,
+            'weights': self._weights,
+            'history': self._history,
+            'config': {'games': self._games, 'seed': self._seed, 'a': self._a, 'c': self._c,
+                       'opening_plies': self._opening_plies},
+        }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint, cache_path=None):
+        config = checkpoint['config']
+        tuner = cls(checkpoint['weights'], config['games'], config['seed'], config['a'], config['c'],
+                    config['opening_plies'], cache_path)
+        tuner._iteration = checkpoint['iteration']
+        tuner._history = checkpoint['history']
+        return tuner
+
+    # Runs one SPSA iteration and returns the perturbed vectors' match score.
+    def step(self, pool):
+        k = self._iteration + 1
+        a_k = self._a / (k + 10) ** 0.602
+        c_k = self._c / k ** 0.101
+
+        rng = random.Random(self._seed * 1000003 + k)
+        delta = [rng.choice((-1, 1)) for _ in self._weights]
+        plus = tuple(max(0.0, w + c_k * d) for w, d in zip(self._weights, delta))
+        minus = tuple(max(0.0, w - c_k * d) for w, d in zip(self._weights, delta))
+
+        match_seed = (self._seed * 1000003 + k) * self._games
+        score = play_match(pool, plus, minus, self._games, match_seed, self._opening_plies,
+                           self._cache_path)
+
+        # Win rate of "plus" above 50% pushes the weights towards "plus".
+        gradient = (2 * score - 1) / (2 * c_k)
+        self._weights = [max(0.0, w + a_k * gradient * d) for w, d in zip(self._weights, delta)]
+
+        self._iteration = k
+        self._history.append({'iteration': k, 'score': score, 'weights': self._weights})
+        return score
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Tune heuristic weights by playing seeded matches in parallel.")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--games', type=int, default=64, help="games per iteration (even)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--checkpoint', default='tune_checkpoint.ckpt')
+    parser.add_argument('--validate-games', type=int, default=0,
+                        help="games to play against the default weights when done")
+    parser.add_argument('--cache', help="evaluation cache file shared by all workers")
+    args = parser.parse_args(argv[1:])
+    # Games are played in colour-swapped pairs, so an odd count would give
+    # one side an extra game as white.
+    if args.games <= 0 or args.games % 2:
+        parser.error("--games must be a positive even number")
+    if args.validate_games % 2:
+        parser.error("--validate-games must be even")
+
+    saved = checkpoint.load_checkpoint(args.checkpoint)
+    if saved is not None:
+        config = saved['config']
+        if config['games'] != args.games or config['seed'] != args.seed:
+            parser.error(f"checkpoint {args.checkpoint} was written with --games {config['games']} "
+                         f"--seed {config['seed']}")
+        tuner = SPSATuner.from_checkpoint(saved, args.cache)
+        print(f"Resuming from iteration {tuner.get_iteration()}")
+    else:
+        tuner = SPSATuner(games=args.games, seed=args.seed, cache_path=args.cache)
+
+    with Pool(args.workers) as pool:
+        while tuner.get_iteration() < args.iterations:
+            score = tuner.step(pool)
+            checkpoint.save_checkpoint(args.checkpoint, tuner.to_checkpoint())
+            weights = ', '.join(f"{w:.3f}" for w in tuner.get_weights())
+            print(f"Iteration {tuner.get_iteration()}: score {score:.3f}, weights ({weights})")
+
+        if args.validate_games > 0:
+            score = play_match(pool, tuner.get_weights(), DEFAULT_WEIGHTS, args.validate_games, args.seed + 7919,
+                               cache_path=args.cache)
+            print(f"Win rate against default weights: {score:.3f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)